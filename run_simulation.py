@@ -6,6 +6,7 @@ Execute hydraulic simulation using WNTR from .inp file
 
 ### Functions:
 - run_simulation_with_wntr(inp_path): Run extended period simulation
+- export_parquet(): Export simulation results to compressed Parquet files (default)
 - export_csv(): Export simulation results (pressure, flowrate) to CSV files
 
 ### Role:
@@ -16,25 +17,122 @@ Execute hydraulic simulation using WNTR from .inp file
 # run_simulation.py
 # Module: Run EPANET hydraulic simulation using WNTR
 
-import wntr
+import hashlib
+import os
+import pickle
+
 import pandas as pd
 
+# Directory for content-addressed simulation result cache
+CACHE_DIR = ".sim_cache"
+
+# Maximum number of cached result files kept on disk
+CACHE_MAX_ENTRIES = 32
+
+# Delete the oldest cache entries beyond CACHE_MAX_ENTRIES
+def _prune_cache():
+    """
+    Keep the result cache bounded: oldest entries go first
+    """
+    try:
+        entries = sorted(
+            (os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR)),
+            key=os.path.getmtime
+        )
+    except OSError:
+        return
+    for path in entries[:-CACHE_MAX_ENTRIES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Compute content hash of an .inp file for cache lookup
+def _inp_cache_key(inp_path):
+    """
+    Return SHA-256 hex digest of the .inp file bytes
+    Identical network files share one cache entry
+    """
+    with open(inp_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
 # Run EPANET simulation using WNTR API
-def run_simulation_with_wntr(inp_path):
+def run_simulation_with_wntr(inp, simulator='epanet'):
     """
-    Execute hydraulic simulation from .inp file
+    Execute hydraulic simulation from an .inp file path or an
+    already-parsed WaterNetworkModel
     Return pressure and flowrate time series data
+    simulator='epanet' shells out to the EPANET solver;
+    simulator='wntr' runs the pure-Python WNTRSimulator, which keeps
+    solver state in process and avoids the per-run startup cost for
+    iterative what-if runs on an in-memory model
+    File inputs are cached on disk keyed by the .inp content hash,
+    so re-running an unchanged network skips the solve
     """
-    wn = wntr.network.WaterNetworkModel(inp_path)
-    sim = wntr.sim.EpanetSimulator(wn)
+    import wntr  # deferred: wntr import costs seconds on cold start
+
+    if isinstance(inp, wntr.network.WaterNetworkModel):
+        wn = inp
+        cache_path = None
+    else:
+        wn = wntr.network.WaterNetworkModel(inp)
+        cache_path = os.path.join(CACHE_DIR, f"{_inp_cache_key(inp)}-{simulator}.pkl")
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                pressure_df, flow_df = pickle.load(f)
+            return pressure_df, flow_df, wn
+
+    if simulator == 'wntr':
+        sim = wntr.sim.WNTRSimulator(wn)
+    else:
+        sim = wntr.sim.EpanetSimulator(wn)
     results = sim.run_sim()
 
     # Extract result time series
     pressure_df = results.node['pressure']    # Pressure at nodes over time (m)
     flow_df = results.link['flowrate']        # Flowrate in pipes over time (m3/s)
 
+    # float32 is ample for hydraulic results (~0.01 m precision) and
+    # halves memory and bandwidth in every downstream display/export
+    pressure_df = pressure_df.astype('float32')
+    flow_df = flow_df.astype('float32')
+
+    if cache_path is not None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump((pressure_df, flow_df), f)
+        _prune_cache()
+
     return pressure_df, flow_df, wn
 
+# Number of rows per chunk when streaming DataFrames to CSV
+CSV_CHUNKSIZE = 10000
+
+# Write buffer size for CSV export (1 MB, fewer syscalls on large files)
+CSV_BUFFER_SIZE = 1 << 20
+
+# Write one DataFrame to CSV through a large buffer in chunks
+def _write_csv(df, path):
+    """
+    Stream a DataFrame to CSV through a 1 MB write buffer
+    """
+    with open(path, 'w', buffering=CSV_BUFFER_SIZE, newline='') as f:
+        df.to_csv(f, chunksize=CSV_CHUNKSIZE)
+
+# Export pressure and flowrate results to Parquet (default format)
+def export_parquet(pressure_df, flow_df, prefix=""):
+    """
+    Export simulation results to snappy-compressed Parquet files
+    Binary columnar output is far smaller and faster to write than CSV
+    """
+    pressure_path = f"{prefix}pressure.parquet"
+    flow_path = f"{prefix}flowrate.parquet"
+
+    pressure_df.to_parquet(pressure_path, compression='snappy')
+    flow_df.to_parquet(flow_path, compression='snappy')
+
+    return pressure_path, flow_path
+
 # Export pressure and flowrate results to CSV
 def export_csv(pressure_df, flow_df, prefix=""):
     """
@@ -43,8 +141,8 @@ def export_csv(pressure_df, flow_df, prefix=""):
     pressure_path = f"{prefix}pressure.csv"
     flow_path = f"{prefix}flowrate.csv"
 
-    pressure_df.to_csv(pressure_path)
-    flow_df.to_csv(flow_path)
+    _write_csv(pressure_df, pressure_path)
+    _write_csv(flow_df, flow_path)
 
     return pressure_path, flow_path
 
@@ -1,10 +1,19 @@
 # app.py
 # Main Application to Run EPANET Simulation on Streamlit Cloud
 
+import hashlib
+
 import streamlit as st
 import pandas as pd
-from table_network import load_xlsx, load_csv, parse_inp_file, validate_network, create_network, draw_graph
-from run_simulation import run_simulation_with_wntr, export_csv
+
+# Session keys derived from one simulation run; dropped together when
+# the results go stale
+SIM_RESULT_KEYS = ('pressure_df', 'flow_df', 'wn', 'pl_pressure', 'pressure_stats')
+SIM_CACHE_KEYS = ('node_coords', 'pressure_values', 'map_col_pos',
+                  'map_fig', 'graph_fig', 'graph_fig_nodes',
+                  'pstat_figs', 'table_downloads')
+from table_network import load_xlsx, load_csv, parse_inp_file, validate_network, create_network, create_wntr_network, draw_graph
+from run_simulation import run_simulation_with_wntr, export_parquet, export_csv
 from view_results import show_pipe_pressure_statistics, show_network_map, show_results_graph, show_results_table
 
 st.set_page_config(page_title="EPANET Cloud Simulation", layout="wide")
@@ -32,10 +41,28 @@ elif data_source == "Upload CSV":
 elif data_source == "Upload INP":
     uploaded_inp = st.sidebar.file_uploader("Upload INP File", type=["inp"])
     if uploaded_inp:
-        nodes, pipes, demands = parse_inp_file(uploaded_inp)
+        nodes, pipes, demands, parsed_wn = parse_inp_file(uploaded_inp)
+        # Keep the parsed model so simulation skips a second .inp parse
+        st.session_state['parsed_wn'] = parsed_wn
+
+if data_source != "Upload INP":
+    st.session_state.pop('parsed_wn', None)
 
 # Data Display & Validation
 if 'nodes' in locals():
+    # Results in session state belong to the tables they were solved
+    # from; drop them when the loaded network changes so the result
+    # widgets never mix stale results with new node/pipe ids
+    table_key = hashlib.sha256(
+        pd.util.hash_pandas_object(nodes, index=False).values.tobytes()
+        + pd.util.hash_pandas_object(pipes, index=False).values.tobytes()
+        + pd.util.hash_pandas_object(demands, index=False).values.tobytes()
+    ).hexdigest()
+    if st.session_state.get('table_key') != table_key:
+        for stale_key in SIM_RESULT_KEYS + SIM_CACHE_KEYS:
+            st.session_state.pop(stale_key, None)
+        st.session_state['table_key'] = table_key
+
     st.subheader("Network Data - Nodes")
     st.dataframe(nodes)
 
@@ -56,22 +83,52 @@ if 'nodes' in locals():
         graph = draw_graph(pipes)
         st.graphviz_chart(graph)
 
-        net = create_network(nodes, pipes, demands)
-
         if st.button("Export INP File"):
+            net = create_network(nodes, pipes, demands)
             net.writeInputFile("generated_network.inp")
             with open("generated_network.inp", "rb") as f:
                 st.download_button("Download INP File", f, file_name="generated_network.inp")
 
+        # Solve once on click, keep results in session state so the
+        # widgets below rerun against cached DataFrames instead of
+        # triggering a new EPANET solve on every interaction
         if st.button("Run Simulation"):
-            pressure_df, flow_df, wn = run_simulation_with_wntr("generated_network.inp")
+            import polars as pl  # deferred: only needed once results exist
+
+            # Simulate the in-memory model directly: no .inp write or
+            # re-parse between the tables and the solver
+            sim_input = st.session_state.get('parsed_wn')
+            if sim_input is None:
+                sim_input = create_wntr_network(nodes, pipes, demands)
+            pressure_df, flow_df, wn = run_simulation_with_wntr(sim_input)
+            st.session_state['pressure_df'] = pressure_df
+            st.session_state['flow_df'] = flow_df
+            st.session_state['wn'] = wn
+            # Polars view for the read-only display paths (fast column
+            # selection and row extraction on every widget interaction)
+            st.session_state['pl_pressure'] = pl.from_pandas(pressure_df.reset_index(names='time'))
+            # Per-node min/max/mean computed once, vectorized across all
+            # columns; pipe statistics become O(1) lookups per selection
+            st.session_state['pressure_stats'] = pressure_df.agg(['min', 'max', 'mean']).T
+            # Drop caches built for the previous network model
+            for stale_key in SIM_CACHE_KEYS:
+                st.session_state.pop(stale_key, None)
+            # Export once per solve, not on every widget rerun
+            export_parquet(pressure_df, flow_df, prefix="final_")
             st.success("Simulation Completed.")
 
+        if 'pressure_df' in st.session_state:
+            pressure_df = st.session_state['pressure_df']
+            flow_df = st.session_state['flow_df']
+            wn = st.session_state['wn']
+            pl_pressure = st.session_state['pl_pressure']
+            pressure_stats = st.session_state['pressure_stats']
+
             st.subheader("Select Pipes to View Pressure Statistics")
             selected_pipes = st.multiselect("Select Pipes", pipes['id'].unique())
 
             if selected_pipes:
-                show_pipe_pressure_statistics(pressure_df, wn, selected_pipes)
+                show_pipe_pressure_statistics(pressure_df, wn, selected_pipes, pressure_stats)
 
             st.subheader("View Pressure on Map")
             timestep = st.slider("Select Timestep", 0, len(pressure_df)-1, 0)
@@ -83,6 +140,7 @@ if 'nodes' in locals():
                 show_results_graph(pressure_df, selected_nodes)
 
             st.subheader("View Results - Table")
-            show_results_table(pressure_df, selected_nodes)
+            show_results_table(pl_pressure, selected_nodes)
 
-            export_csv(pressure_df, flow_df, prefix="final_")
+            if st.button("Export Results as CSV"):
+                export_csv(pressure_df, flow_df, prefix="final_")
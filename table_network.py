@@ -9,6 +9,7 @@ Manage network input data for EPANET modeling.
 - parse_inp_file(): Parse existing EPANET .inp file into DataFrames
 - validate_network(): Check network logic (duplicate IDs, isolated nodes, invalid pipes)
 - create_network(): Generate EPANET network object for export
+- create_wntr_network(): Build WNTR model in memory for direct simulation
 - draw_graph(): Draw network using Graphviz
 
 ### Role:
@@ -18,19 +19,22 @@ Manage network input data for EPANET modeling.
 '''
 # Module: Data Input, Validation, and Network Creation for EPANET
 
+from collections import Counter
+
 import streamlit as st
 import pandas as pd
-from epanettools.epanettools import Network, EPANetSimulation
-from graphviz import Digraph
 import tempfile
 
+# wntr, epanettools and graphviz are imported lazily inside the
+# functions that need them: they cost seconds on a cold Streamlit run
+
 # Load network data from Excel file (3 sheets)
 def load_xlsx(file):
-    xls = pd.ExcelFile(file)
-    nodes = pd.read_excel(xls, 'node')
-    pipes = pd.read_excel(xls, 'pipe')
-    demands = pd.read_excel(xls, 'demand')
-    return nodes, pipes, demands
+    """
+    Read all three sheets in a single workbook pass
+    """
+    sheets = pd.read_excel(file, sheet_name=['node', 'pipe', 'demand'])
+    return sheets['node'], sheets['pipe'], sheets['demand']
 
 # Load network data from 3 CSV files
 def load_csv(files_dict):
@@ -41,36 +45,48 @@ def load_csv(files_dict):
 
 # Parse EPANET .inp file to DataFrames
 def parse_inp_file(file):
+    """
+    Parse an uploaded .inp file with WNTR in a single pass
+    Return node/pipe/demand DataFrames plus the WaterNetworkModel,
+    so the simulation step can reuse the parsed model directly
+    """
+    import wntr
+
     with tempfile.NamedTemporaryFile(delete=False, suffix=".inp") as tmp:
         tmp.write(file.read())
         tmp.flush()
-        sim = EPANetSimulation(tmp.name)
+        wn = wntr.network.WaterNetworkModel(tmp.name)
 
     nodes_data = []
     pipes_data = []
     demands_data = []
 
-    for node in sim.network.nodes:
+    for name, node in wn.nodes():
+        if getattr(node, 'coordinates', None):
+            x, y = node.coordinates
+        else:
+            x, y = (0, 0)
         nodes_data.append([
             'tank' if node.node_type == 'Tank' else 'node',
-            node.id,
-            0, 0, node.elevation
+            name, x, y,
+            getattr(node, 'elevation', getattr(node, 'base_head', 0))
         ])
 
-    for link in sim.network.links:
-        if link.link_type == 'Pipe':
-            pipes_data.append([
-                link.id, link.start_node.id, link.end_node.id,
-                link.length, link.diameter, link.roughness
-            ])
+    for name, link in wn.pipes():
+        # wntr stores diameters in SI meters; the pipe table is mm
+        pipes_data.append([
+            name, link.start_node_name, link.end_node_name,
+            link.length, link.diameter * 1000, link.roughness
+        ])
 
-    for j in sim.network.junctions:
-        demands_data.append([j.id, j.base_demand])
+    for name, junction in wn.junctions():
+        demands_data.append([name, junction.base_demand])
 
     return (
         pd.DataFrame(nodes_data, columns=['type', 'id', 'x', 'y', 'elevation']),
         pd.DataFrame(pipes_data, columns=['id', 'from', 'to', 'length', 'diameter', 'roughness']),
-        pd.DataFrame(demands_data, columns=['node_id', 'demand (m3/s)'])
+        pd.DataFrame(demands_data, columns=['node_id', 'demand (m3/s)']),
+        wn
     )
 
 # Validate network logic: Check ID duplicates, isolated nodes, missing connections
@@ -78,59 +94,115 @@ def validate_network(nodes_df, pipes_df, demands_df):
     errors = []
     suggestions = []
 
-    node_ids = nodes_df['id'].dropna().tolist()
-    pipe_ids = pipes_df['id'].dropna().tolist()
+    # One hashing pass per ID column: counts give duplicates, keys give the set
+    node_counts = Counter(nodes_df['id'].dropna())
+    node_set = set(node_counts)
     demand_ids = demands_df['node_id'].dropna().tolist()
 
-    duplicate_nodes = nodes_df['id'][nodes_df['id'].duplicated()]
-    if not duplicate_nodes.empty:
-        errors.append(f"Duplicate node IDs: {', '.join(duplicate_nodes.unique())}")
+    duplicate_nodes = [k for k, v in node_counts.items() if v > 1]
+    if duplicate_nodes:
+        errors.append(f"Duplicate node IDs: {', '.join(duplicate_nodes)}")
         suggestions.append("Remove or rename duplicate node IDs.")
 
-    duplicate_pipes = pipes_df['id'][pipes_df['id'].duplicated()]
-    if not duplicate_pipes.empty:
-        errors.append(f"Duplicate pipe IDs: {', '.join(duplicate_pipes.unique())}")
+    pipe_counts = Counter(pipes_df['id'].dropna())
+    duplicate_pipes = [k for k, v in pipe_counts.items() if v > 1]
+    if duplicate_pipes:
+        errors.append(f"Duplicate pipe IDs: {', '.join(duplicate_pipes)}")
         suggestions.append("Ensure each pipe ID is unique.")
 
-    for _, row in pipes_df.iterrows():
-        if row['from'] not in node_ids:
-            errors.append(f"Pipe {row['id']} connects from unknown node '{row['from']}'")
-            suggestions.append(f"Add node '{row['from']}' to node table.")
-        if row['to'] not in node_ids:
-            errors.append(f"Pipe {row['id']} connects to unknown node '{row['to']}'")
-            suggestions.append(f"Add node '{row['to']}' to node table.")
+    # Vectorized endpoint checks: boolean masks instead of a list scan per pipe
+    bad_from = pipes_df.loc[~pipes_df['from'].isin(node_set), ['id', 'from']]
+    for pid, node in zip(bad_from['id'], bad_from['from']):
+        errors.append(f"Pipe {pid} connects from unknown node '{node}'")
+        suggestions.append(f"Add node '{node}' to node table.")
+
+    bad_to = pipes_df.loc[~pipes_df['to'].isin(node_set), ['id', 'to']]
+    for pid, node in zip(bad_to['id'], bad_to['to']):
+        errors.append(f"Pipe {pid} connects to unknown node '{node}'")
+        suggestions.append(f"Add node '{node}' to node table.")
 
     for node in demand_ids:
-        if node not in node_ids:
+        if node not in node_set:
             errors.append(f"Demand specified at non-existent node '{node}'")
             suggestions.append(f"Check demand node '{node}' or add it to node table.")
 
     connected = set(pipes_df['from']).union(set(pipes_df['to']))
-    isolated = [n for n in node_ids if n not in connected and nodes_df[nodes_df['id'] == n]['type'].values[0] != 'tank']
+    tank_ids = set(nodes_df.loc[nodes_df['type'] == 'tank', 'id'])
+    isolated = (node_set - connected) - tank_ids
     if isolated:
-        errors.append(f"Isolated nodes with no connected pipes: {', '.join(isolated)}")
+        errors.append(f"Isolated nodes with no connected pipes: {', '.join(sorted(isolated))}")
         suggestions.append(f"Connect isolated nodes with pipes.")
 
     return errors, suggestions
 
 # Create EPANET network object from DataFrames
 def create_network(nodes_df, pipes_df, demands_df):
+    from epanettools.epanettools import Network
+
     net = Network()
-    for _, row in nodes_df.iterrows():
-        if row['type'] == 'tank':
-            net.addTank(row['id'], row['x'], row['y'], row['elevation'])
+    # zip over the columns directly: no per-row Series construction as with iterrows
+    for nid, x, y, elev, typ in zip(nodes_df['id'], nodes_df['x'], nodes_df['y'],
+                                    nodes_df['elevation'], nodes_df['type']):
+        if typ == 'tank':
+            net.addTank(nid, x, y, elev)
         else:
-            net.addNode(row['id'], row['x'], row['y'], row['elevation'])
-    for _, row in pipes_df.iterrows():
-        net.addPipe(row['id'], row['from'], row['to'], row['length'], row['diameter'], row['roughness'])
-    for _, row in demands_df.iterrows():
-        if pd.notna(row['node_id']):
-            net.addDemand(row['node_id'], row['demand (m3/s)'], 'BASE')
+            net.addNode(nid, x, y, elev)
+    for pid, start, end, length, diameter, roughness in zip(
+            pipes_df['id'], pipes_df['from'], pipes_df['to'],
+            pipes_df['length'], pipes_df['diameter'], pipes_df['roughness']):
+        net.addPipe(pid, start, end, length, diameter, roughness)
+    for nid, demand in zip(demands_df['node_id'], demands_df['demand (m3/s)']):
+        if pd.notna(nid):
+            net.addDemand(nid, demand, 'BASE')
     return net
 
+# Build a WNTR network model directly from DataFrames
+def create_wntr_network(nodes_df, pipes_df, demands_df):
+    """
+    Populate a wntr WaterNetworkModel from the node/pipe/demand tables
+    Bypasses the epanettools object and the .inp file round-trip on the
+    simulation path; wntr expects SI units, so pipe diameters (mm) are
+    converted to meters
+    """
+    import wntr
+
+    wn = wntr.network.WaterNetworkModel()
+
+    demand_map = {nid: demand for nid, demand
+                  in zip(demands_df['node_id'], demands_df['demand (m3/s)'])
+                  if pd.notna(nid)}
+
+    for nid, x, y, elev, typ in zip(nodes_df['id'], nodes_df['x'], nodes_df['y'],
+                                    nodes_df['elevation'], nodes_df['type']):
+        if typ == 'tank':
+            wn.add_tank(nid, elevation=elev, coordinates=(x, y))
+        else:
+            wn.add_junction(nid, base_demand=demand_map.get(nid, 0),
+                            elevation=elev, coordinates=(x, y))
+
+    for pid, start, end, length, diameter, roughness in zip(
+            pipes_df['id'], pipes_df['from'], pipes_df['to'],
+            pipes_df['length'], pipes_df['diameter'], pipes_df['roughness']):
+        wn.add_pipe(pid, start, end, length=length,
+                    diameter=diameter / 1000.0, roughness=roughness)
+
+    return wn
+
+# Build Graphviz source from pipe rows, cached on content
+@st.cache_data(show_spinner=False)
+def build_graph_source(pipes_tuple):
+    """
+    Return Graphviz source text for (id, from, to, diameter) rows
+    Cached so an unchanged pipe table skips the rebuild on every rerun
+    """
+    from graphviz import Digraph
+
+    dot = Digraph()
+    for pid, start, end, diameter in pipes_tuple:
+        dot.edge(start, end, label=f"{pid} ({diameter}mm)")
+    return dot.source
+
 # Draw network graph using Graphviz
 def draw_graph(pipes_df):
-    dot = Digraph()
-    for _, row in pipes_df.iterrows():
-        dot.edge(row['from'], row['to'], label=f"{row['id']} ({row['diameter']}mm)")
-    return dot
+    pipes_tuple = tuple(zip(pipes_df['id'], pipes_df['from'], pipes_df['to'], pipes_df['diameter']))
+    return build_graph_source(pipes_tuple)
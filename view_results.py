@@ -20,19 +20,25 @@ Display simulation results and statistical analysis
 # view_results.py
 # Module: Visualization and Analysis of EPANET Simulation Results with Map View, Graph View, Table View
 
+import io
+
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
 
+# plotly is imported lazily inside each show_* function to keep the
+# first page paint fast on a cold Streamlit run
+
 # Display pressure statistics and chart for selected pipes
-def show_pipe_pressure_statistics(pressure_df, wn, pipe_ids):
+def show_pipe_pressure_statistics(pressure_df, wn, pipe_ids, stats_df):
     """
     For each selected pipe:
     - Get start and end nodes
-    - Show min, max, average pressure
+    - Show min, max, average pressure from the precomputed stats table
     - Draw Plotly pressure-time chart
     """
+    import plotly.express as px
+
     node_pairs = [(wn.get_link(pid).start_node_name, wn.get_link(pid).end_node_name) for pid in pipe_ids]
 
     st.subheader("Pressure Statistics for Selected Pipes")
@@ -40,107 +46,158 @@ def show_pipe_pressure_statistics(pressure_df, wn, pipe_ids):
     for i, (start_node, end_node) in enumerate(node_pairs):
         for node in [start_node, end_node]:
             if node in pressure_df.columns:
-                stats = pressure_df[node].agg(['min', 'max', 'mean'])
+                stats = stats_df.loc[node]
                 st.markdown(f"**Node {node}**")
                 st.write(stats.to_frame(name='Pressure (m)'))
 
-                fig = px.line(
-                    pressure_df,
-                    y=node,
-                    title=f"Pressure Over Time - Node {node}",
-                    labels={"index": "Time Step", node: "Pressure (m)"}
-                )
-                st.plotly_chart(fig)
+                # Reuse the per-node figure across reruns instead of
+                # rebuilding and re-serializing it on every interaction
+                fig_cache = st.session_state.setdefault('pstat_figs', {})
+                if node not in fig_cache:
+                    fig_cache[node] = px.line(
+                        pressure_df,
+                        y=node,
+                        title=f"Pressure Over Time - Node {node}",
+                        labels={"index": "Time Step", node: "Pressure (m)"}
+                    )
+                st.plotly_chart(fig_cache[node], key=f"pstat_{i}_{node}")
             else:
                 st.warning(f"Node {node} not found in pressure results.")
 
+# Extract static node coordinate arrays from the network model once
+def build_node_coords(wn):
+    """
+    Return (x_arr, y_arr, id_arr) numpy arrays for all nodes, cached in
+    session state; coordinates are static, so per-timestep work reduces
+    to one pressure reindex against id_arr
+    """
+    if 'node_coords' not in st.session_state:
+        x_list = []
+        y_list = []
+        id_list = []
+        for node_name, node in wn.nodes():
+            if hasattr(node, 'coordinates'):
+                x, y = node.coordinates
+            else:
+                x, y = (0, 0)  # default position if not defined
+            x_list.append(x)
+            y_list.append(y)
+            id_list.append(node_name)
+        st.session_state['node_coords'] = (
+            np.asarray(x_list), np.asarray(y_list), np.asarray(id_list)
+        )
+    return st.session_state['node_coords']
+
 # View network pressure results on Map
 def show_network_map(pressure_df, wn, timestep=-1, parameter='pressure'):
     """
     Display node pressure results on a map with color-coded markers.
+    One row extraction per timestep; nodes without results become NaN
     """
+    import plotly.graph_objects as go
+
     st.subheader("Network Map View - Pressure Distribution")
 
-    node_positions = {}
-    x_list = []
-    y_list = []
-    pressure_list = []
-    id_list = []
-
-    for node_name, node in wn.nodes():
-        if hasattr(node, 'coordinates'):
-            x, y = node.coordinates
-        else:
-            x, y = (0, 0)  # default position if not defined
-
-        x_list.append(x)
-        y_list.append(y)
-        id_list.append(node_name)
-
-        if node_name in pressure_df.columns:
-            pressure_value = pressure_df[node_name].iloc[timestep]
-        else:
-            pressure_value = None
-
-        pressure_list.append(pressure_value)
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=x_list,
-        y=y_list,
-        mode='markers+text',
-        marker=dict(
-            size=12,
-            color=pressure_list,
-            colorscale='Viridis',
-            colorbar=dict(title='Pressure (m)'),
-            showscale=True
-        ),
-        text=id_list,
-        hoverinfo='text'
-    ))
-
-    fig.update_layout(
-        title="Pressure Map at Selected Timestep",
-        xaxis_title="X Coordinate",
-        yaxis_title="Y Coordinate",
-        height=600
-    )
-
-    st.plotly_chart(fig)
+    x_arr, y_arr, id_arr = build_node_coords(wn)
+
+    # Raw numpy view of the results plus node -> column positions,
+    # built once; each slider move is then a plain array row access
+    # instead of a pandas label lookup
+    if 'pressure_values' not in st.session_state:
+        st.session_state['pressure_values'] = pressure_df.to_numpy()
+        col_idx = {c: i for i, c in enumerate(pressure_df.columns)}
+        st.session_state['map_col_pos'] = np.asarray([col_idx.get(n, -1) for n in id_arr])
+    values = st.session_state['pressure_values']
+    col_pos = st.session_state['map_col_pos']
+
+    pressure_row = values[timestep]
+    pressure_list = np.where(col_pos >= 0, pressure_row[col_pos], np.nan)
+
+    # Build the figure once; later timesteps only patch the marker
+    # colors instead of re-serializing the whole figure
+    if 'map_fig' not in st.session_state:
+        fig = go.Figure()
+        # Scattergl renders via WebGL and stays responsive on networks
+        # far beyond what the SVG scatter can handle; node ids move to
+        # hover text since WebGL text support is limited
+        fig.add_trace(go.Scattergl(
+            x=x_arr,
+            y=y_arr,
+            mode='markers',
+            marker=dict(
+                size=12,
+                color=pressure_list,
+                colorscale='Viridis',
+                colorbar=dict(title='Pressure (m)'),
+                showscale=True
+            ),
+            text=id_arr,
+            hoverinfo='text'
+        ))
+
+        fig.update_layout(
+            title="Pressure Map at Selected Timestep",
+            xaxis_title="X Coordinate",
+            yaxis_title="Y Coordinate",
+            height=600
+        )
+        st.session_state['map_fig'] = fig
+    else:
+        fig = st.session_state['map_fig']
+        fig.data[0].marker.color = pressure_list
+
+    st.plotly_chart(fig, use_container_width=True, key='map')
 
 # View simulation results as Graph for selected nodes
 def show_results_graph(pressure_df, selected_nodes):
     """
     Plot pressure vs time line chart for selected nodes
     """
+    import plotly.express as px
+
     st.subheader("Results View - Graph")
 
-    fig = go.Figure()
-    for node in selected_nodes:
-        if node in pressure_df.columns:
-            fig.add_trace(go.Scatter(
-                y=pressure_df[node],
-                mode='lines',
-                name=node
-            ))
-    fig.update_layout(
-        title="Pressure Over Time",
-        xaxis_title="Time Step",
-        yaxis_title="Pressure (m)"
-    )
-    st.plotly_chart(fig)
+    # Rebuild only when the node selection changes; slider-driven
+    # reruns reuse the stored figure untouched. Melting to long form
+    # lets one px.line call emit the whole chart instead of a
+    # go.Scatter trace per node
+    if st.session_state.get('graph_fig_nodes') != tuple(selected_nodes):
+        present = [n for n in selected_nodes if n in pressure_df.columns]
+        long_df = pressure_df[present].reset_index(names='time').melt(
+            id_vars='time', var_name='node', value_name='pressure')
+        fig = px.line(
+            long_df,
+            x='time', y='pressure', color='node',
+            title="Pressure Over Time",
+            labels={'time': 'Time (s)', 'pressure': 'Pressure (m)', 'node': 'Node'}
+        )
+        st.session_state['graph_fig'] = fig
+        st.session_state['graph_fig_nodes'] = tuple(selected_nodes)
+
+    st.plotly_chart(st.session_state['graph_fig'], key='graph')
 
 # View simulation results as Table for selected nodes
-def show_results_table(pressure_df, selected_nodes):
+def show_results_table(pl_pressure, selected_nodes):
     """
     Show DataFrame table of pressure values for selected nodes
+    Column selection runs on the polars view; conversion back to
+    pandas happens only for the rendered slice
     """
     st.subheader("Results View - Table")
 
-    df_show = pressure_df[selected_nodes]
+    df_show = pl_pressure.select(['time'] + list(selected_nodes)).to_pandas().set_index('time')
     st.dataframe(df_show)
 
-    csv = df_show.to_csv(index=True).encode('utf-8')
-    st.download_button("Download Table as CSV", csv, file_name="pressure_results.csv")
+    # Generate download payloads once per node selection; writing CSV
+    # into a BytesIO avoids materializing the string and re-encoding it
+    downloads = st.session_state.setdefault('table_downloads', {})
+    key = tuple(selected_nodes)
+    if key not in downloads:
+        buf = io.BytesIO()
+        df_show.to_csv(buf)
+        downloads[key] = (df_show.to_parquet(compression='snappy'), buf.getvalue())
+    parquet_bytes, csv_bytes = downloads[key]
+
+    st.download_button("Download Table as Parquet", parquet_bytes, file_name="pressure_results.parquet")
+    st.download_button("Download Table as CSV", csv_bytes, file_name="pressure_results.csv")
 